@@ -0,0 +1,147 @@
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Intervalo mínimo (segundos) entre backups quando há alterações
+BACKUP_INTERVAL = int(os.environ.get('MECANICAR_BACKUP_INTERVAL', 300))
+# Quantidade de escritas que dispara um backup antes do intervalo
+BACKUP_WRITE_THRESHOLD = int(os.environ.get('MECANICAR_BACKUP_WRITES', 50))
+# Quantidade de gerações antigas mantidas (backup.db.1, backup.db.2, ...)
+BACKUP_GENERATIONS = int(os.environ.get('MECANICAR_BACKUP_GENERATIONS', 5))
+# Intervalo (segundos) entre as verificações da thread de backup
+CHECK_INTERVAL = 5
+
+logger = logging.getLogger(__name__)
+
+# Única thread de backup do processo (ver start_scheduler)
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+# Lê o contador de alterações mantido pelas triggers de db_funcs
+def _read_version(conn):
+    try:
+        row = conn.execute('SELECT version FROM change_counter WHERE id = 1').fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+# Renomeia backup.db -> backup.db.1 -> backup.db.2 ..., descartando a geração mais antiga
+def _rotate(backup_path, generations):
+    for generation in range(generations, 0, -1):
+        older = f'{backup_path}.{generation - 1}' if generation > 1 else backup_path
+        if os.path.exists(older):
+            os.replace(older, f'{backup_path}.{generation}')
+
+# Função para verificar a integridade de um arquivo de banco de dados
+def check_integrity(db_path):
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    try:
+        return conn.execute('PRAGMA integrity_check').fetchone()[0] == 'ok'
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
+
+# Função para fazer backup do banco de dados usando a API de backup online do SQLite,
+# que copia um snapshot consistente mesmo com escritas em andamento
+def backup_database(db_path, backup_path, generations=BACKUP_GENERATIONS):
+    # Arquivo temporário exclusivo no mesmo diretório, para que o os.replace seja atômico
+    fd, tmp_path = tempfile.mkstemp(prefix=f'{os.path.basename(backup_path)}.', suffix='.tmp',
+                                    dir=os.path.dirname(os.path.abspath(backup_path)))
+    os.close(fd)
+    try:
+        src = sqlite3.connect(db_path)
+        dst = sqlite3.connect(tmp_path)
+        try:
+            src.backup(dst)
+            version = _read_version(dst)
+            # O backup herda o modo WAL do banco; volta ao journal comum para que o
+            # arquivo seja autocontido e não deixe -wal/-shm ao lado
+            dst.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            dst.close()
+            src.close()
+        if generations:
+            _rotate(backup_path, generations)
+        os.replace(tmp_path, backup_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return version
+
+# Função para restaurar o banco de dados a partir do backup; o backup só é aplicado
+# se passar na verificação de integridade
+def restore_database(db_path, backup_path):
+    if not check_integrity(backup_path):
+        raise sqlite3.DatabaseError(f'Backup corrompido: {backup_path}')
+    src = sqlite3.connect(backup_path)
+    dst = sqlite3.connect(db_path)
+    try:
+        live_version = _read_version(dst)
+        src.backup(dst)
+        # O contador precisa continuar subindo para que as telas percebam a mudança
+        with dst:
+            dst.execute('UPDATE change_counter SET version = ? WHERE id = 1', (max(live_version, _read_version(dst)) + 1,))
+    finally:
+        dst.close()
+        src.close()
+
+# Thread que faz backups periódicos, apenas quando houve alterações desde o último
+class BackupScheduler(threading.Thread):
+    def __init__(self, db_path, backup_path, interval=BACKUP_INTERVAL,
+                 write_threshold=BACKUP_WRITE_THRESHOLD, generations=BACKUP_GENERATIONS):
+        super().__init__(name='mecanicar-backup', daemon=True)
+        self.db_path = db_path
+        self.backup_path = backup_path
+        self.interval = interval
+        self.write_threshold = write_threshold
+        self.generations = generations
+        self.last_version = None
+        self.last_backup = 0.0
+        self._stop_event = threading.Event()
+
+    # Faz o backup se os dados mudaram e o intervalo ou o limite de escritas foi atingido
+    def run_pending(self, force=False):
+        if not os.path.exists(self.db_path):
+            return False
+        conn = sqlite3.connect(self.db_path)
+        try:
+            version = _read_version(conn)
+        finally:
+            conn.close()
+        if version == self.last_version and not force:
+            return False
+        writes = version - (self.last_version or 0)
+        due = time.monotonic() - self.last_backup >= self.interval
+        if not (force or self.last_version is None or due or writes >= self.write_threshold):
+            return False
+        self.last_version = backup_database(self.db_path, self.backup_path, self.generations)
+        self.last_backup = time.monotonic()
+        return True
+
+    def run(self):
+        while True:
+            try:
+                self.run_pending()
+            except (sqlite3.Error, OSError):
+                logger.exception('Falha no backup de %s', self.db_path)
+            if self._stop_event.wait(CHECK_INTERVAL):
+                return
+
+    def stop(self):
+        self._stop_event.set()
+
+# Inicia a thread de backup uma única vez por processo. Fica fora dos caches do
+# Streamlit porque "Clear cache" também limpa st.cache_resource, o que criaria outra
+# thread gravando as mesmas gerações de backup.
+def start_scheduler(db_path, backup_path):
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = BackupScheduler(db_path, backup_path)
+            _scheduler.start()
+        return _scheduler
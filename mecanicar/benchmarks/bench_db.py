@@ -0,0 +1,91 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import make_yard, parse_sizes, print_summary, summarize, synthetic_rows
+
+import db_funcs
+from render import render_table_html
+
+# Microbenchmarks das funções de db_funcs sobre pátios fictícios:
+#   python mecanicar/benchmarks/bench_db.py --sizes 1000,10000,100000 --repeat 50
+
+# Casos medidos: nome -> função sem argumentos (recebe os ids ativos e o gerador aleatório)
+def build_cases(ids, rng):
+    created = []
+
+    def add():
+        created.append(db_funcs.add_vehicle("Benchmark ABC1D23", "Paulo", "Vini", "Na fila"))
+
+    def delete():
+        if created:
+            db_funcs.delete_data(created.pop())
+
+    # Importa dentro de uma transação desfeita ao final, para que o pátio continue com o
+    # mesmo tamanho nos casos seguintes (o tempo do COMMIT fica de fora da medida)
+    def bulk_add():
+        with db_funcs.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                db_funcs.bulk_add_vehicles(synthetic_rows(1000, rng))
+            finally:
+                conn.execute("ROLLBACK")
+
+    return {
+        "get_data_version": db_funcs.get_data_version,
+        "view_all_data": db_funcs.view_all_data,
+        "get_data_by_status": lambda: db_funcs.get_data_by_status(rng.choice(db_funcs.STATUS_OPTIONS)),
+        "get_data_by_consultant": lambda: db_funcs.get_data_by_consultant(rng.choice(db_funcs.CONSULTANTS)),
+        "get_data_by_mechanic": lambda: db_funcs.get_data_by_mechanic(rng.choice(db_funcs.MECHANICS)),
+        "get_vehicle": lambda: db_funcs.get_vehicle(rng.choice(ids)),
+        "get_vehicle_history": lambda: db_funcs.get_vehicle_history(rng.choice(ids)),
+        "search_vehicles (placa)": lambda: db_funcs.search_vehicles(rng.choice("ABCDEFGHIJ") + rng.choice("ABCDEFGHIJ")),
+        "search_vehicles (modelo cor)": lambda: db_funcs.search_vehicles("onix pre"),
+        "get_status_counts": db_funcs.get_status_counts,
+        "get_consultant_workload": db_funcs.get_consultant_workload,
+        "get_mechanic_workload": db_funcs.get_mechanic_workload,
+        "get_status_time_stats": db_funcs.get_status_time_stats,
+        "get_current_status_ages": db_funcs.get_current_status_ages,
+        "add_vehicle": add,
+        "update_vehicle_status": lambda: db_funcs.update_vehicle_status(rng.choice(ids), rng.choice(db_funcs.STATUS_OPTIONS)),
+        "update_vehicle_consultant_mechanic_status": lambda: db_funcs.update_vehicle_consultant_mechanic_status(
+            rng.choice(ids), rng.choice(db_funcs.CONSULTANTS), rng.choice(db_funcs.MECHANICS), rng.choice(db_funcs.STATUS_OPTIONS)
+        ),
+        "delete_data": delete,
+        "bulk_add_vehicles (1000)": bulk_add,
+        "iter_vehicles (tabela inteira)": lambda: sum(len(rows) for rows in db_funcs.iter_vehicles()),
+        "group_vehicles": lambda: db_funcs.group_vehicles(db_funcs.view_all_data()),
+        "render_table_html (tabela inteira)": lambda: render_table_html(db_funcs.view_all_data()),
+    }
+
+def run(sizes, repeat, seed, workdir):
+    for size in sizes:
+        started = time.perf_counter()
+        make_yard(os.path.join(workdir, f"yard-{size}.db"), size, seed)
+        print(f"\nPátio com {size} veículos criado em {time.perf_counter() - started:.1f} s")
+        rng = random.Random(seed)
+        ids = [row[0] for row in db_funcs.view_all_data()]
+        results = {}
+        for name, case in build_cases(ids, rng).items():
+            case()  # aquecimento
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                case()
+                samples.append(time.perf_counter() - start)
+            results[name] = summarize(samples)
+        print_summary(f"db_funcs - {size} veículos", results)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks de db_funcs")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("1000,10000,100000"))
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        run(args.sizes, args.repeat, args.seed, workdir)
+
+if __name__ == "__main__":
+    main()
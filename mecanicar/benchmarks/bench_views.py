@@ -0,0 +1,65 @@
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from common import APP_DIR, REPO_DIR, make_yard, parse_sizes, print_summary, summarize
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+# Tempo de execução completa do main.py para cada opção do menu, rodando o app sem
+# navegador pelo AppTest do Streamlit:
+#   python mecanicar/benchmarks/bench_views.py --sizes 1000,10000 --repeat 10
+# "fria" é a primeira execução após limpar os caches; "quente" são as seguintes, com os
+# caches compartilhados entre sessões já preenchidos (o caso comum com várias telas).
+
+MAIN_SCRIPT = os.path.join(APP_DIR, "main.py")
+
+def new_session(timeout):
+    return AppTest.from_file(MAIN_SCRIPT, default_timeout=timeout)
+
+def run(sizes, repeat, seed, workdir, timeout):
+    os.chdir(REPO_DIR)  # o app usa caminhos relativos à raiz do repositório
+    os.environ["MECANICAR_BACKUP_PATH"] = os.path.join(workdir, "backup.db")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    views = None
+    for size in sizes:
+        make_yard(os.path.join(workdir, f"yard-{size}.db"), size, seed)
+        if views is None:
+            views = new_session(timeout).run().sidebar.radio[0].options
+        results = {}
+        for view in views:
+            cold = None
+            samples = []
+            for attempt in range(repeat + 1):
+                at = new_session(timeout).run()
+                if attempt == 0:
+                    st.cache_data.clear()
+                    st.cache_resource.clear()
+                start = time.perf_counter()
+                at.sidebar.radio[0].set_value(view).run()
+                elapsed = time.perf_counter() - start
+                if at.exception:
+                    raise RuntimeError(f"{view}: {at.exception[0].message}")
+                if attempt == 0:
+                    cold = elapsed
+                else:
+                    samples.append(elapsed)
+            results[f"{view} (fria)"] = summarize([cold])
+            results[f"{view} (quente)"] = summarize(samples)
+        print_summary(f"main.py - {size} veículos", results)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de execução das telas do main.py")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("1000,10000"))
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        run(args.sizes, args.repeat, args.seed, workdir, args.timeout)
+
+if __name__ == "__main__":
+    main()
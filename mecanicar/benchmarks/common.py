@@ -0,0 +1,79 @@
+import os
+import random
+import string
+import sys
+
+# Permite importar os módulos do app ao rodar os scripts direto:
+#   python mecanicar/benchmarks/bench_db.py
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(APP_DIR)
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+import db_funcs
+
+MODELS = ["Gol", "Onix", "HB20", "Ka", "Celta", "S10", "Compass", "Cruze", "Corolla", "Hilux", "Strada", "Up"]
+COLORS = ["Branco", "Preto", "Prata", "Vermelho", "Azul", "Cinza"]
+
+# Placa no padrão Mercosul (ABC1D23)
+def random_plate(rng):
+    letters = string.ascii_uppercase
+    return f"{''.join(rng.choices(letters, k=3))}{rng.randint(0, 9)}{rng.choice(letters)}{rng.randint(0, 99):02d}"
+
+# Gera linhas (vehicle, consultant, mechanic, status) de um pátio fictício
+def synthetic_rows(size, rng):
+    for _ in range(size):
+        yield (
+            f"{rng.choice(MODELS)} {rng.choice(COLORS)} {random_plate(rng)}",
+            rng.choice(db_funcs.CONSULTANTS),
+            rng.choice(db_funcs.MECHANICS),
+            rng.choice(db_funcs.STATUS_OPTIONS),
+        )
+
+# Aponta db_funcs para db_path, descartando as conexões abertas para outro banco
+def use_database(db_path):
+    db_funcs.close_all_connections()
+    db_funcs.DB_PATH = db_path
+
+# Cria um pátio fictício com size veículos em db_path. Uma fração dos veículos muda de
+# status (gerando histórico) e outra é excluída (serviços encerrados).
+def make_yard(db_path, size, seed=42, updated=0.5, closed=0.1):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    use_database(db_path)
+    db_funcs.create_table()
+    rng = random.Random(seed)
+    db_funcs.bulk_add_vehicles(synthetic_rows(size, rng))
+    ids = [row[0] for row in db_funcs.view_all_data()]
+    with db_funcs.transaction():
+        for vehicle_id in rng.sample(ids, int(len(ids) * updated)):
+            db_funcs.update_vehicle_consultant_mechanic_status(
+                vehicle_id, rng.choice(db_funcs.CONSULTANTS), rng.choice(db_funcs.MECHANICS), rng.choice(db_funcs.STATUS_OPTIONS)
+            )
+        for vehicle_id in rng.sample(ids, int(len(ids) * closed)):
+            db_funcs.delete_data(vehicle_id)
+    return db_path
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+# Resumo de uma lista de durações em segundos, em milissegundos
+def summarize(samples):
+    return {
+        "n": len(samples),
+        "p50": percentile(samples, 0.50) * 1000,
+        "p95": percentile(samples, 0.95) * 1000,
+        "p99": percentile(samples, 0.99) * 1000,
+        "max": max(samples) * 1000,
+    }
+
+def print_summary(title, results):
+    print(f"\n{title}")
+    print(f"{'':44} {'n':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in results.items():
+        print(f"{name:44} {stats['n']:>7} {stats['p50']:>9.2f} {stats['p95']:>9.2f} {stats['p99']:>9.2f} {stats['max']:>9.2f}")
+
+def parse_sizes(text):
+    return [int(size) for size in text.split(",")]
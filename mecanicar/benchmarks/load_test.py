@@ -0,0 +1,99 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from common import make_yard, print_summary, summarize
+
+import db_funcs
+
+# Teste de carga: várias sessões lendo e algumas gravando ao mesmo tempo, como as telas
+# da oficina fazem no Streamlit (uma thread por sessão no mesmo processo):
+#   python mecanicar/benchmarks/load_test.py --size 10000 --readers 12 --writers 3 --duration 30
+# Mede a latência de cada função de db_funcs pelos hooks de instrumentação e conta os
+# erros de "database is locked".
+
+# Sessão de tela: a cada intervalo consulta a versão e só relê o pátio quando ela muda
+def reader(stop, interval, rng, errors):
+    seen = None
+    while not stop.is_set():
+        try:
+            version = db_funcs.get_data_version()
+            if version != seen:
+                db_funcs.view_all_data()
+                db_funcs.get_data_by_status(rng.choice(db_funcs.STATUS_OPTIONS))
+                db_funcs.get_status_counts()
+                seen = version
+            if rng.random() < 0.1:
+                db_funcs.search_vehicles(rng.choice(["gol", "onix pr", "ab", "hb20 azul"]))
+        except sqlite3.OperationalError as error:
+            errors.append(str(error))
+        stop.wait(interval)
+
+# Estação de trabalho: adiciona, atualiza e exclui veículos
+def writer(stop, interval, rng, ids, errors):
+    while not stop.is_set():
+        try:
+            operation = rng.random()
+            if operation < 0.3:
+                ids.append(db_funcs.add_vehicle("Carga ABC1D23", rng.choice(db_funcs.CONSULTANTS), rng.choice(db_funcs.MECHANICS), "Na fila"))
+            elif operation < 0.9:
+                db_funcs.update_vehicle_consultant_mechanic_status(
+                    rng.choice(ids), rng.choice(db_funcs.CONSULTANTS), rng.choice(db_funcs.MECHANICS), rng.choice(db_funcs.STATUS_OPTIONS)
+                )
+            elif len(ids) > 1:
+                db_funcs.delete_data(ids.pop(rng.randrange(len(ids))))
+        except sqlite3.OperationalError as error:
+            errors.append(str(error))
+        stop.wait(interval)
+
+def run(db_path, size, readers, writers, duration, read_interval, write_interval, seed):
+    make_yard(db_path, size, seed)
+    ids = [row[0] for row in db_funcs.view_all_data()]
+    samples = {}
+    errors = []
+
+    def hook(name, elapsed, thread_id):
+        samples.setdefault(name, []).append(elapsed)
+
+    stop = threading.Event()
+    threads = [threading.Thread(target=reader, args=(stop, read_interval, random.Random(seed + i), errors)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(stop, write_interval, random.Random(-seed - i), ids, errors)) for i in range(writers)]
+    db_funcs.add_timing_hook(hook)
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    finally:
+        db_funcs.remove_timing_hook(hook)
+
+    print_summary(f"Carga: {readers} leitores, {writers} escritores, {duration:.0f} s, {size} veículos",
+                  {name: summarize(values) for name, values in sorted(samples.items())})
+    calls = sum(len(values) for values in samples.values())
+    locked = sum("locked" in error or "busy" in error for error in errors)
+    print(f"\n{calls} chamadas ({calls / duration:.0f}/s), {len(errors)} erros, {locked} de banco bloqueado")
+    return locked
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga com leitores e escritores simultâneos")
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--readers", type=int, default=12)
+    parser.add_argument("--writers", type=int, default=3)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--read-interval", type=float, default=0.05, help="segundos entre as verificações de cada leitor")
+    parser.add_argument("--write-interval", type=float, default=0.02, help="segundos entre as escritas de cada escritor")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        locked = run(os.path.join(workdir, "load.db"), args.size, args.readers, args.writers, args.duration,
+                     args.read_interval, args.write_interval, args.seed)
+    return 1 if locked else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
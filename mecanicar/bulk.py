@@ -0,0 +1,161 @@
+import codecs
+import csv
+import io
+
+from db_funcs import EXPORT_CHUNK_SIZE, IMPORT_BATCH_SIZE, VEHICLE_FIELDS, bulk_add_vehicles, iter_vehicles
+
+# Colunas dos arquivos exportados
+FIELDS = VEHICLE_FIELDS
+
+# Cabeçalhos aceitos na importação (em inglês ou como aparecem nas telas)
+HEADER_ALIASES = {
+    "vehicle": "vehicle", "veículo": "vehicle", "veiculo": "vehicle",
+    "consultant": "consultant", "consultor": "consultant",
+    "mechanic": "mechanic", "mecânico": "mechanic", "mecanico": "mechanic",
+    "status": "status",
+}
+
+# Colunas obrigatórias na importação
+REQUIRED_FIELDS = VEHICLE_FIELDS[1:]
+
+FORMATS = ["csv", "parquet"]
+
+# Separadores aceitos no CSV (o Excel em português salva com ";")
+DELIMITERS = ",;"
+
+# Cabeçalho do arquivo sem alguma das colunas obrigatórias
+class InvalidHeader(ValueError):
+    pass
+
+# Descobre o formato pelo nome do arquivo
+def detect_format(filename):
+    return "parquet" if filename.lower().endswith(".parquet") else "csv"
+
+# O pyarrow é necessário apenas para arquivos Parquet
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("Instale o pacote pyarrow para importar ou exportar arquivos Parquet") from error
+    return pyarrow
+
+# Converte os cabeçalhos do arquivo para os nomes usados em db_funcs
+def _normalize(record):
+    return {HEADER_ALIASES.get(str(key).strip().lower(), key): value for key, value in record.items()}
+
+# Verifica o cabeçalho antes de ler as linhas, para rejeitar o arquivo uma única vez
+def _check_header(names):
+    found = {HEADER_ALIASES.get(str(name).strip().lower(), name) for name in names or []}
+    missing = [field for field in REQUIRED_FIELDS if field not in found]
+    if missing:
+        raise InvalidHeader(f"Cabeçalho inválido: faltam as colunas {', '.join(missing)} (use Veículo, Consultor, Mecânico e Status)")
+
+# Descobre a codificação de um CSV: UTF-8 se o arquivo inteiro for UTF-8 válido, senão
+# cp1252 (o padrão do Excel e dos sistemas em português no Windows). O arquivo volta
+# para a posição inicial.
+def detect_encoding(file, chunk_size=1 << 20):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    start = file.tell()
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            decoder.decode(chunk, final=not chunk)
+            if not chunk:
+                return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp1252"
+    finally:
+        file.seek(start)
+
+# Descobre o separador do CSV (vírgula ou ponto e vírgula) pela linha do cabeçalho. O
+# arquivo volta para a posição inicial.
+def detect_delimiter(file, encoding="utf-8-sig", sample_size=64 * 1024):
+    start = file.tell()
+    try:
+        lines = file.read(sample_size).decode(encoding, errors="replace").splitlines()
+    finally:
+        file.seek(start)
+    try:
+        return csv.Sniffer().sniff(lines[0] if lines else "", delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        return ","
+
+# Lê um CSV (arquivo binário) linha a linha
+def read_csv_rows(file, encoding="utf-8-sig", delimiter=","):
+    text = io.TextIOWrapper(file, encoding=encoding, newline="")
+    try:
+        reader = csv.DictReader(text, delimiter=delimiter)
+        _check_header(reader.fieldnames)
+        for record in reader:
+            yield _normalize(record)
+    finally:
+        text.detach()
+
+# Lê um Parquet em blocos de batch_size linhas
+def read_parquet_rows(file, batch_size=IMPORT_BATCH_SIZE):
+    pyarrow = _require_pyarrow()
+    parquet = pyarrow.parquet.ParquetFile(file)
+    _check_header(parquet.schema_arrow.names)
+    for batch in parquet.iter_batches(batch_size=batch_size):
+        for record in batch.to_pylist():
+            yield _normalize(record)
+
+# Repassa as linhas lidas até o arquivo ficar ilegível (codificação errada, CSV ou Parquet
+# inválido); o erro é anotado em errors e a leitura para ali
+def _until_unreadable(rows, errors, start):
+    line = start
+    try:
+        for row in rows:
+            yield row
+            line += 1
+    except InvalidHeader as error:
+        errors.append((1, str(error)))
+    except (csv.Error, ValueError) as error:
+        errors.append((line, f"Leitura do arquivo interrompida: {error}"))
+
+# Importa um arquivo CSV ou Parquet; retorna (quantidade importada, lista de (linha, erro)).
+# Sem encoding e delimiter, a codificação (UTF-8 ou cp1252) e o separador (, ou ;) do CSV
+# são detectados. Se o arquivo ficar ilegível no meio, os lotes anteriores continuam
+# gravados e o erro entra na lista.
+def import_file(file, fmt="csv", batch_size=IMPORT_BATCH_SIZE, encoding=None, delimiter=None):
+    # Erros apontam a linha do arquivo: no CSV a linha 1 é o cabeçalho
+    if fmt == "parquet":
+        rows, start = read_parquet_rows(file, batch_size), 1
+    else:
+        encoding = encoding or detect_encoding(file)
+        rows, start = read_csv_rows(file, encoding, delimiter or detect_delimiter(file, encoding)), 2
+    read_errors = []
+    inserted, errors = bulk_add_vehicles(_until_unreadable(rows, read_errors, start), batch_size, start)
+    return inserted, errors + read_errors
+
+# Exporta os veículos como CSV para um arquivo binário, bloco a bloco
+def export_csv(out, chunk_size=EXPORT_CHUNK_SIZE):
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(FIELDS)
+    total = 0
+    for rows in iter_vehicles(chunk_size):
+        writer.writerows(rows)
+        total += len(rows)
+    text.flush()
+    text.detach()
+    return total
+
+# Exporta os veículos como Parquet, um row group por bloco
+def export_parquet(out, chunk_size=EXPORT_CHUNK_SIZE):
+    pyarrow = _require_pyarrow()
+    schema = pyarrow.schema([("id", pyarrow.int64())] + [(name, pyarrow.string()) for name in FIELDS[1:]])
+    total = 0
+    with pyarrow.parquet.ParquetWriter(out, schema) as writer:
+        for rows in iter_vehicles(chunk_size):
+            columns = list(zip(*rows))
+            writer.write_table(pyarrow.Table.from_arrays([pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+            total += len(rows)
+    return total
+
+# Exporta os veículos no formato escolhido; retorna a quantidade exportada
+def export_file(out, fmt="csv", chunk_size=EXPORT_CHUNK_SIZE):
+    if fmt == "parquet":
+        return export_parquet(out, chunk_size)
+    return export_csv(out, chunk_size)
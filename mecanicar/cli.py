@@ -0,0 +1,47 @@
+import argparse
+import sys
+
+import db_funcs
+from bulk import FORMATS, detect_format, export_file, import_file
+
+# Linha de comando para importar e exportar veículos em lote:
+#   python mecanicar/cli.py import entrada.csv
+#   python mecanicar/cli.py export saida.parquet --chunk-size 10000
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importação e exportação de veículos em lote")
+    parser.add_argument("--db", default=db_funcs.DB_PATH, help="caminho do banco de dados")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="importa veículos de um arquivo CSV ou Parquet")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--format", choices=FORMATS)
+    import_parser.add_argument("--batch-size", type=int, default=db_funcs.IMPORT_BATCH_SIZE)
+    import_parser.add_argument("--encoding", help="codificação do CSV (padrão: detecta UTF-8 ou cp1252)")
+    import_parser.add_argument("--delimiter", help="separador do CSV (padrão: detecta , ou ;)")
+
+    export_parser = commands.add_parser("export", help="exporta os veículos para um arquivo CSV ou Parquet")
+    export_parser.add_argument("file")
+    export_parser.add_argument("--format", choices=FORMATS)
+    export_parser.add_argument("--chunk-size", type=int, default=db_funcs.EXPORT_CHUNK_SIZE)
+
+    args = parser.parse_args(argv)
+    db_funcs.DB_PATH = args.db
+    db_funcs.create_table()
+    fmt = args.format or detect_format(args.file)
+
+    if args.command == "import":
+        with open(args.file, "rb") as file:
+            inserted, errors = import_file(file, fmt, args.batch_size, args.encoding, args.delimiter)
+        for line, error in errors:
+            print(f"linha {line}: {error}", file=sys.stderr)
+        print(f"{inserted} veículos importados, {len(errors)} linhas rejeitadas")
+        return 1 if errors else 0
+
+    with open(args.file, "wb") as file:
+        total = export_file(file, fmt, args.chunk_size)
+    print(f"{total} veículos exportados para {args.file}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
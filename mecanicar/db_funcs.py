@@ -1,76 +1,589 @@
+import functools
+import logging
+import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 
-DB_PATH = 'mecanicar/database.db'
+DB_PATH = os.environ.get('MECANICAR_DB_PATH', 'mecanicar/database.db')
 
+# Chamadas mais lentas que este limite (ms) são registradas no log; 0 desliga
+SLOW_QUERY_MS = float(os.environ.get('MECANICAR_SLOW_QUERY_MS', 0))
+
+# Valores aceitos para status, consultor e mecânico
+STATUS_OPTIONS = ["Na fila", "Orçamento", "Aguardando Peças", "Em serviço", "Pronto para retirada"]
+CONSULTANTS = ["Paulo", "Jéssica", "Samuel", "Rafael", "Rudimar"]
+MECHANICS = ["Vini", "Valdo", "Danilo", "Fosco", "Szczhoca", "Weslei"]
+
+# Linhas por transação na importação em lote e por bloco na exportação
+IMPORT_BATCH_SIZE = 5000
+EXPORT_CHUNK_SIZE = 5000
+
+# Quantidade padrão de resultados por página na busca
+SEARCH_LIMIT = 50
+
+# Tempo máximo (ms) que uma conexão espera por um lock antes de falhar
+BUSY_TIMEOUT_MS = 5000
+# Quantidade máxima de conexões ociosas mantidas no pool
+POOL_SIZE = 8
+
+# Instante atual em segundos (epoch) nas instruções SQL
+NOW_SQL = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+# Descrição do veículo sem hífens e pontos, para que a busca por "abc1d"
+# encontre a placa "ABC-1D23"
+VEHICLE_KEY_SQL = "REPLACE(REPLACE({column}, '-', ''), '.', '')"
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+_local = threading.local()
+_timing_hooks = []
+
+logger = logging.getLogger(__name__)
+
+# Registra uma função hook(nome, segundos, thread_id) chamada ao fim de cada função pública
+def add_timing_hook(hook):
+    _timing_hooks.append(hook)
+
+def remove_timing_hook(hook):
+    _timing_hooks.remove(hook)
+
+# Acumula em uma lista (nome, segundos) das chamadas feitas pela thread atual dentro do
+# bloco; num bloco aninhado as chamadas também entram na lista do bloco externo
+@contextmanager
+def thread_timings():
+    outer = getattr(_local, 'timings', None)
+    timings = _local.timings = []
+    try:
+        yield timings
+    finally:
+        _local.timings = outer
+        if outer is not None:
+            outer.extend(timings)
+
+# Mede a duração da função quando há hooks, coleta na thread ou log de lentidão ligados;
+# caso contrário a chamada segue direto, sem custo extra
+def timed(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = getattr(_local, 'timings', None)
+        if not _timing_hooks and not SLOW_QUERY_MS and timings is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if timings is not None:
+                timings.append((func.__name__, elapsed))
+            for hook in list(_timing_hooks):
+                hook(func.__name__, elapsed, threading.get_ident())
+            if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+                logger.warning('Consulta lenta: %s levou %.1f ms', func.__name__, elapsed * 1000)
+    return wrapper
+
+# Abre uma nova conexão já configurada em modo WAL
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    return conn
+
+# Retira uma conexão do pool (ou abre uma nova se o pool estiver vazio)
+def _acquire():
+    while True:
+        try:
+            db_path, conn = _pool.get_nowait()
+        except queue.Empty:
+            return DB_PATH, _connect(DB_PATH)
+        if db_path == DB_PATH:
+            return db_path, conn
+        conn.close()
+
+# Devolve a conexão ao pool (ou fecha se o pool estiver cheio)
+def _release(db_path, conn):
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _pool.put_nowait((db_path, conn))
+    except queue.Full:
+        conn.close()
+
+# Fornece a conexão da thread atual; chamadas aninhadas reutilizam a mesma conexão
+@contextmanager
+def connection():
+    current = getattr(_local, 'conn', None)
+    if current is not None:
+        yield current
+        return
+    db_path, conn = _acquire()
+    _local.conn = conn
+    try:
+        yield conn
+    finally:
+        _local.conn = None
+        _release(db_path, conn)
+
+# Executa o bloco dentro de uma transação; transações aninhadas se juntam à externa
+@contextmanager
+def transaction():
+    with connection() as conn:
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+# Fecha todas as conexões ociosas do pool
+def close_all_connections():
+    while True:
+        try:
+            _, conn = _pool.get_nowait()
+        except queue.Empty:
+            return
+        conn.close()
+
+# Migrações do esquema, aplicadas em ordem. A posição na lista (a partir de 1)
+# é a versão gravada em PRAGMA user_version depois que a migração é aplicada.
+MIGRATIONS = [
+    # 1: tabela de veículos e contador de alterações
+    [
+        '''CREATE TABLE IF NOT EXISTS vehicles (
+            id INTEGER PRIMARY KEY,
+            vehicle TEXT NOT NULL,
+            consultant TEXT NOT NULL,
+            mechanic TEXT NOT NULL,
+            status TEXT NOT NULL
+            )''',
+        '''CREATE TABLE IF NOT EXISTS change_counter (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+            )''',
+        'INSERT OR IGNORE INTO change_counter (id, version) VALUES (1, 0)',
+    ] + [
+        f'''CREATE TRIGGER IF NOT EXISTS vehicles_{event.lower()}_version
+            AFTER {event} ON vehicles
+            BEGIN
+                UPDATE change_counter SET version = version + 1 WHERE id = 1;
+            END'''
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ],
+    # 2: índices para os filtros por status, consultor, mecânico e descrição
+    [
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_status ON vehicles (status)',
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_consultant_status ON vehicles (consultant, status)',
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_mechanic_status ON vehicles (mechanic, status)',
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_vehicle ON vehicles (vehicle)',
+    ],
+    # 3: histórico de status e agregados mantidos por triggers
+    [
+        'ALTER TABLE vehicles ADD COLUMN status_since INTEGER',
+        f'UPDATE vehicles SET status_since = {NOW_SQL}',
+        # Uma linha por transição; to_status NULL indica que o veículo saiu do pátio
+        '''CREATE TABLE status_history (
+            id INTEGER PRIMARY KEY,
+            vehicle_id INTEGER NOT NULL,
+            from_status TEXT,
+            to_status TEXT,
+            changed_at INTEGER NOT NULL,
+            seconds_in_status INTEGER
+            )''',
+        'CREATE INDEX idx_status_history_vehicle ON status_history (vehicle_id, id)',
+        'CREATE TABLE status_counts (status TEXT PRIMARY KEY, total INTEGER NOT NULL)',
+        '''CREATE TABLE consultant_counts (
+            consultant TEXT NOT NULL,
+            status TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (consultant, status)
+            )''',
+        '''CREATE TABLE mechanic_counts (
+            mechanic TEXT NOT NULL,
+            status TEXT NOT NULL,
+            total INTEGER NOT NULL,
+            PRIMARY KEY (mechanic, status)
+            )''',
+        # Tempo que os veículos passaram em cada status (estadias já encerradas)
+        '''CREATE TABLE status_time_stats (
+            status TEXT PRIMARY KEY,
+            transitions INTEGER NOT NULL,
+            total_seconds INTEGER NOT NULL,
+            max_seconds INTEGER NOT NULL
+            )''',
+        'INSERT INTO status_history (vehicle_id, from_status, to_status, changed_at) SELECT id, NULL, status, status_since FROM vehicles',
+        'INSERT INTO status_counts (status, total) SELECT status, COUNT(*) FROM vehicles GROUP BY status',
+        'INSERT INTO consultant_counts (consultant, status, total) SELECT consultant, status, COUNT(*) FROM vehicles GROUP BY consultant, status',
+        'INSERT INTO mechanic_counts (mechanic, status, total) SELECT mechanic, status, COUNT(*) FROM vehicles GROUP BY mechanic, status',
+        f'''CREATE TRIGGER vehicles_insert_history AFTER INSERT ON vehicles
+            BEGIN
+                INSERT INTO status_history (vehicle_id, from_status, to_status, changed_at)
+                    VALUES (NEW.id, NULL, NEW.status, {NOW_SQL});
+                INSERT INTO status_counts (status, total) VALUES (NEW.status, 1)
+                    ON CONFLICT (status) DO UPDATE SET total = total + 1;
+                INSERT INTO consultant_counts (consultant, status, total) VALUES (NEW.consultant, NEW.status, 1)
+                    ON CONFLICT (consultant, status) DO UPDATE SET total = total + 1;
+                INSERT INTO mechanic_counts (mechanic, status, total) VALUES (NEW.mechanic, NEW.status, 1)
+                    ON CONFLICT (mechanic, status) DO UPDATE SET total = total + 1;
+            END''',
+        '''CREATE TRIGGER vehicles_update_counts AFTER UPDATE OF status, consultant, mechanic ON vehicles
+            WHEN OLD.status IS NOT NEW.status OR OLD.consultant IS NOT NEW.consultant OR OLD.mechanic IS NOT NEW.mechanic
+            BEGIN
+                UPDATE status_counts SET total = total - 1 WHERE status = OLD.status;
+                UPDATE consultant_counts SET total = total - 1 WHERE consultant = OLD.consultant AND status = OLD.status;
+                UPDATE mechanic_counts SET total = total - 1 WHERE mechanic = OLD.mechanic AND status = OLD.status;
+                INSERT INTO status_counts (status, total) VALUES (NEW.status, 1)
+                    ON CONFLICT (status) DO UPDATE SET total = total + 1;
+                INSERT INTO consultant_counts (consultant, status, total) VALUES (NEW.consultant, NEW.status, 1)
+                    ON CONFLICT (consultant, status) DO UPDATE SET total = total + 1;
+                INSERT INTO mechanic_counts (mechanic, status, total) VALUES (NEW.mechanic, NEW.status, 1)
+                    ON CONFLICT (mechanic, status) DO UPDATE SET total = total + 1;
+            END''',
+        f'''CREATE TRIGGER vehicles_update_history AFTER UPDATE OF status ON vehicles
+            WHEN OLD.status IS NOT NEW.status
+            BEGIN
+                INSERT INTO status_history (vehicle_id, from_status, to_status, changed_at, seconds_in_status)
+                    VALUES (NEW.id, OLD.status, NEW.status, {NOW_SQL}, {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}));
+                INSERT INTO status_time_stats (status, transitions, total_seconds, max_seconds)
+                    VALUES (OLD.status, 1, {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}), {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}))
+                    ON CONFLICT (status) DO UPDATE SET
+                        transitions = transitions + 1,
+                        total_seconds = total_seconds + excluded.total_seconds,
+                        max_seconds = MAX(max_seconds, excluded.max_seconds);
+            END''',
+        f'''CREATE TRIGGER vehicles_delete_history AFTER DELETE ON vehicles
+            BEGIN
+                INSERT INTO status_history (vehicle_id, from_status, to_status, changed_at, seconds_in_status)
+                    VALUES (OLD.id, OLD.status, NULL, {NOW_SQL}, {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}));
+                INSERT INTO status_time_stats (status, transitions, total_seconds, max_seconds)
+                    VALUES (OLD.status, 1, {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}), {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}))
+                    ON CONFLICT (status) DO UPDATE SET
+                        transitions = transitions + 1,
+                        total_seconds = total_seconds + excluded.total_seconds,
+                        max_seconds = MAX(max_seconds, excluded.max_seconds);
+                UPDATE status_counts SET total = total - 1 WHERE status = OLD.status;
+                UPDATE consultant_counts SET total = total - 1 WHERE consultant = OLD.consultant AND status = OLD.status;
+                UPDATE mechanic_counts SET total = total - 1 WHERE mechanic = OLD.mechanic AND status = OLD.status;
+            END''',
+    ],
+    # 4: recria vehicles com AUTOINCREMENT para que o id de um veículo excluído nunca seja
+    # reaproveitado (o histórico e a busca continuam apontando para o veículo certo)
+    [
+        '''CREATE TABLE vehicles_autoincrement (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            vehicle TEXT NOT NULL,
+            consultant TEXT NOT NULL,
+            mechanic TEXT NOT NULL,
+            status TEXT NOT NULL,
+            status_since INTEGER
+            )''',
+        '''INSERT INTO vehicles_autoincrement (id, vehicle, consultant, mechanic, status, status_since)
+            SELECT id, vehicle, consultant, mechanic, status, status_since FROM vehicles''',
+        'DROP TABLE vehicles',
+        'ALTER TABLE vehicles_autoincrement RENAME TO vehicles',
+        "DELETE FROM sqlite_sequence WHERE name = 'vehicles'",
+        '''INSERT INTO sqlite_sequence (name, seq)
+            SELECT 'vehicles', MAX(COALESCE((SELECT MAX(id) FROM vehicles), 0), COALESCE((SELECT MAX(vehicle_id) FROM status_history), 0))''',
+        # DROP TABLE descartou os índices e triggers de vehicles criados nas migrações 1 a 3
+        '''CREATE TRIGGER IF NOT EXISTS vehicles_insert_version
+            AFTER INSERT ON vehicles
+            BEGIN
+                UPDATE change_counter SET version = version + 1 WHERE id = 1;
+            END''',
+        '''CREATE TRIGGER IF NOT EXISTS vehicles_update_version
+            AFTER UPDATE ON vehicles
+            BEGIN
+                UPDATE change_counter SET version = version + 1 WHERE id = 1;
+            END''',
+        '''CREATE TRIGGER IF NOT EXISTS vehicles_delete_version
+            AFTER DELETE ON vehicles
+            BEGIN
+                UPDATE change_counter SET version = version + 1 WHERE id = 1;
+            END''',
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_status ON vehicles (status)',
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_consultant_status ON vehicles (consultant, status)',
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_mechanic_status ON vehicles (mechanic, status)',
+        'CREATE INDEX IF NOT EXISTS idx_vehicles_vehicle ON vehicles (vehicle)',
+        f'''CREATE TRIGGER vehicles_insert_history AFTER INSERT ON vehicles
+            BEGIN
+                INSERT INTO status_history (vehicle_id, from_status, to_status, changed_at)
+                    VALUES (NEW.id, NULL, NEW.status, {NOW_SQL});
+                INSERT INTO status_counts (status, total) VALUES (NEW.status, 1)
+                    ON CONFLICT (status) DO UPDATE SET total = total + 1;
+                INSERT INTO consultant_counts (consultant, status, total) VALUES (NEW.consultant, NEW.status, 1)
+                    ON CONFLICT (consultant, status) DO UPDATE SET total = total + 1;
+                INSERT INTO mechanic_counts (mechanic, status, total) VALUES (NEW.mechanic, NEW.status, 1)
+                    ON CONFLICT (mechanic, status) DO UPDATE SET total = total + 1;
+            END''',
+        '''CREATE TRIGGER vehicles_update_counts AFTER UPDATE OF status, consultant, mechanic ON vehicles
+            WHEN OLD.status IS NOT NEW.status OR OLD.consultant IS NOT NEW.consultant OR OLD.mechanic IS NOT NEW.mechanic
+            BEGIN
+                UPDATE status_counts SET total = total - 1 WHERE status = OLD.status;
+                UPDATE consultant_counts SET total = total - 1 WHERE consultant = OLD.consultant AND status = OLD.status;
+                UPDATE mechanic_counts SET total = total - 1 WHERE mechanic = OLD.mechanic AND status = OLD.status;
+                INSERT INTO status_counts (status, total) VALUES (NEW.status, 1)
+                    ON CONFLICT (status) DO UPDATE SET total = total + 1;
+                INSERT INTO consultant_counts (consultant, status, total) VALUES (NEW.consultant, NEW.status, 1)
+                    ON CONFLICT (consultant, status) DO UPDATE SET total = total + 1;
+                INSERT INTO mechanic_counts (mechanic, status, total) VALUES (NEW.mechanic, NEW.status, 1)
+                    ON CONFLICT (mechanic, status) DO UPDATE SET total = total + 1;
+            END''',
+        f'''CREATE TRIGGER vehicles_update_history AFTER UPDATE OF status ON vehicles
+            WHEN OLD.status IS NOT NEW.status
+            BEGIN
+                INSERT INTO status_history (vehicle_id, from_status, to_status, changed_at, seconds_in_status)
+                    VALUES (NEW.id, OLD.status, NEW.status, {NOW_SQL}, {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}));
+                INSERT INTO status_time_stats (status, transitions, total_seconds, max_seconds)
+                    VALUES (OLD.status, 1, {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}), {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}))
+                    ON CONFLICT (status) DO UPDATE SET
+                        transitions = transitions + 1,
+                        total_seconds = total_seconds + excluded.total_seconds,
+                        max_seconds = MAX(max_seconds, excluded.max_seconds);
+            END''',
+        f'''CREATE TRIGGER vehicles_delete_history AFTER DELETE ON vehicles
+            BEGIN
+                INSERT INTO status_history (vehicle_id, from_status, to_status, changed_at, seconds_in_status)
+                    VALUES (OLD.id, OLD.status, NULL, {NOW_SQL}, {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}));
+                INSERT INTO status_time_stats (status, transitions, total_seconds, max_seconds)
+                    VALUES (OLD.status, 1, {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}), {NOW_SQL} - COALESCE(OLD.status_since, {NOW_SQL}))
+                    ON CONFLICT (status) DO UPDATE SET
+                        transitions = transitions + 1,
+                        total_seconds = total_seconds + excluded.total_seconds,
+                        max_seconds = MAX(max_seconds, excluded.max_seconds);
+                UPDATE status_counts SET total = total - 1 WHERE status = OLD.status;
+                UPDATE consultant_counts SET total = total - 1 WHERE consultant = OLD.consultant AND status = OLD.status;
+                UPDATE mechanic_counts SET total = total - 1 WHERE mechanic = OLD.mechanic AND status = OLD.status;
+            END''',
+    ],
+    # 5: índice de busca (FTS5) dos veículos ativos e encerrados; o rowid é o id do
+    # veículo e, quando ele é excluído, o registro fica marcado como encerrado
+    [
+        '''CREATE VIRTUAL TABLE vehicles_fts USING fts5(
+            vehicle, vehicle_key, consultant, mechanic,
+            status UNINDEXED, closed UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+            )''',
+        f'''INSERT INTO vehicles_fts (rowid, vehicle, vehicle_key, consultant, mechanic, status, closed)
+            SELECT id, vehicle, {VEHICLE_KEY_SQL.format(column='vehicle')}, consultant, mechanic, status, 0 FROM vehicles''',
+        f'''CREATE TRIGGER vehicles_insert_fts AFTER INSERT ON vehicles
+            BEGIN
+                INSERT INTO vehicles_fts (rowid, vehicle, vehicle_key, consultant, mechanic, status, closed)
+                    VALUES (NEW.id, NEW.vehicle, {VEHICLE_KEY_SQL.format(column='NEW.vehicle')}, NEW.consultant, NEW.mechanic, NEW.status, 0);
+            END''',
+        f'''CREATE TRIGGER vehicles_update_fts AFTER UPDATE OF vehicle, consultant, mechanic, status ON vehicles
+            BEGIN
+                UPDATE vehicles_fts SET vehicle = NEW.vehicle, vehicle_key = {VEHICLE_KEY_SQL.format(column='NEW.vehicle')},
+                    consultant = NEW.consultant, mechanic = NEW.mechanic, status = NEW.status
+                    WHERE rowid = NEW.id;
+            END''',
+        '''CREATE TRIGGER vehicles_delete_fts AFTER DELETE ON vehicles
+            BEGIN
+                UPDATE vehicles_fts SET closed = 1 WHERE rowid = OLD.id;
+            END''',
+    ],
+    # 6: índices que as consultas realmente usam. Nenhuma consulta filtra mais pela
+    # descrição (edição e exclusão usam o id, a busca usa vehicles_fts), e os filtros por
+    # consultor e mecânico ordenam por id, o que (consultant) e (mechanic) já atendem pelo
+    # rowid implícito no fim do índice, sem ordenação temporária
+    [
+        'DROP INDEX IF EXISTS idx_vehicles_vehicle',
+        'DROP INDEX IF EXISTS idx_vehicles_consultant_status',
+        'DROP INDEX IF EXISTS idx_vehicles_mechanic_status',
+        'CREATE INDEX idx_vehicles_consultant ON vehicles (consultant)',
+        'CREATE INDEX idx_vehicles_mechanic ON vehicles (mechanic)',
+    ],
+]
+
+# Retorna a versão do esquema gravada no banco
+@timed
+def get_schema_version():
+    with connection() as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+# Cria as tabelas e aplica as migrações pendentes
+@timed
 def create_table():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS vehicles (
-                id INTEGER PRIMARY KEY,
-                vehicle TEXT NOT NULL,
-                consultant TEXT NOT NULL,
-                mechanic TEXT NOT NULL,
-                status TEXT NOT NULL
-                )''')
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        current = conn.execute('PRAGMA user_version').fetchone()[0]
+        for version, statements in enumerate(MIGRATIONS[current:], start=current + 1):
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
 
+# Retorna a versão atual dos dados; muda sempre que a tabela vehicles é alterada
+@timed
+def get_data_version():
+    with connection() as conn:
+        row = conn.execute('SELECT version FROM change_counter WHERE id = 1').fetchone()
+    return row[0] if row else 0
+
+@timed
 def add_vehicle(vehicle, consultant, mechanic, status):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('INSERT INTO vehicles (vehicle, consultant, mechanic, status) VALUES (?, ?, ?, ?)', (vehicle, consultant, mechanic, status))
-    conn.commit()
-    conn.close()
-
-def update_vehicle_status(vehicle, new_status):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('UPDATE vehicles SET status=? WHERE vehicle=?', (new_status, vehicle))
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        return conn.execute(f'INSERT INTO vehicles (vehicle, consultant, mechanic, status, status_since) VALUES (?, ?, ?, ?, {NOW_SQL})', (vehicle, consultant, mechanic, status)).lastrowid
+
+# Valida os campos de um veículo; retorna a mensagem de erro ou None
+def validate_vehicle(vehicle, consultant, mechanic, status):
+    if not vehicle:
+        return 'Veículo não informado'
+    if consultant not in CONSULTANTS:
+        return f'Consultor desconhecido: {consultant}'
+    if mechanic not in MECHANICS:
+        return f'Mecânico desconhecido: {mechanic}'
+    if status not in STATUS_OPTIONS:
+        return f'Status desconhecido: {status}'
+    return None
+
+# Importa veículos em lote. rows é um iterável de tuplas (vehicle, consultant, mechanic, status)
+# ou de dicionários com essas chaves; as linhas válidas são gravadas com executemany, uma
+# transação por lote. Retorna (quantidade importada, lista de (linha, erro)); a primeira
+# linha recebe o número start (2 num CSV, cuja linha 1 é o cabeçalho).
+@timed
+def bulk_add_vehicles(rows, batch_size=IMPORT_BATCH_SIZE, start=1):
+    inserted = 0
+    errors = []
+    batch = []
+
+    def flush():
+        with transaction() as conn:
+            conn.executemany(f'INSERT INTO vehicles (vehicle, consultant, mechanic, status, status_since) VALUES (?, ?, ?, ?, {NOW_SQL})', batch)
+        batch.clear()
+
+    for line, row in enumerate(rows, start=start):
+        if isinstance(row, dict):
+            row = (row.get('vehicle'), row.get('consultant'), row.get('mechanic'), row.get('status'))
+        row = tuple(value.strip() if isinstance(value, str) else value for value in row)
+        error = validate_vehicle(*row)
+        if error:
+            errors.append((line, error))
+            continue
+        batch.append(row)
+        inserted += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return inserted, errors
+
+@timed
+def update_vehicle_status(vehicle_id, new_status):
+    with transaction() as conn:
+        conn.execute(f'UPDATE vehicles SET status=?, status_since=CASE WHEN status IS ? THEN status_since ELSE {NOW_SQL} END WHERE id=?', (new_status, new_status, vehicle_id))
 
+@timed
+def get_vehicle(vehicle_id):
+    with connection() as conn:
+        return conn.execute('SELECT id, vehicle, consultant, mechanic, status FROM vehicles WHERE id=?', (vehicle_id,)).fetchone()
+
+@timed
 def view_all_data():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT vehicle, consultant, mechanic, status FROM vehicles')
-    data = c.fetchall()
-    conn.close()
-    return data
+    with connection() as conn:
+        return conn.execute('SELECT id, vehicle, consultant, mechanic, status FROM vehicles ORDER BY id').fetchall()
+
+# Percorre todos os veículos em blocos, sem carregar a tabela inteira na memória
+def iter_vehicles(chunk_size=EXPORT_CHUNK_SIZE):
+    with connection() as conn:
+        cursor = conn.execute('SELECT id, vehicle, consultant, mechanic, status FROM vehicles ORDER BY id')
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
+# Campos das linhas retornadas pelas consultas de veículos
+VEHICLE_FIELDS = ["id", "vehicle", "consultant", "mechanic", "status"]
+
+# Monta a consulta FTS5: cada palavra digitada vira um prefixo ("abc"*), todas obrigatórias
+def _search_query(text):
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', text))
+
+# Busca veículos por placa, modelo, consultor ou mecânico (prefixo de cada palavra).
+# Retorna (id, veículo, consultor, mecânico, status, encerrado), dos mais recentes para
+# os mais antigos; limit e offset paginam o resultado.
+@timed
+def search_vehicles(text, limit=SEARCH_LIMIT, offset=0, include_closed=True):
+    query = _search_query(text)
+    if not query:
+        return []
+    closed_filter = '' if include_closed else 'AND closed = 0'
+    with connection() as conn:
+        return conn.execute(f'SELECT rowid, vehicle, consultant, mechanic, status, closed FROM vehicles_fts WHERE vehicles_fts MATCH ? {closed_filter} ORDER BY rowid DESC LIMIT ? OFFSET ?', (query, limit, offset)).fetchall()
 
+# Posição, nas linhas retornadas pelas consultas, das colunas usadas para fatiar o pátio
+SLICE_COLUMNS = {"consultant": 2, "mechanic": 3, "status": 4}
+
+# Agrupa as linhas em memória por consultor, mecânico e status: {coluna: {valor: [linhas]}}
+def group_vehicles(rows):
+    slices = {column: {} for column in SLICE_COLUMNS}
+    for row in rows:
+        for column, position in SLICE_COLUMNS.items():
+            slices[column].setdefault(row[position], []).append(row)
+    return slices
+
+@timed
 def get_data_by_status(status):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT vehicle, consultant, mechanic, status FROM vehicles WHERE status=?', (status,))
-    data = c.fetchall()
-    conn.close()
-    return data
+    with connection() as conn:
+        return conn.execute('SELECT id, vehicle, consultant, mechanic, status FROM vehicles WHERE status=? ORDER BY id', (status,)).fetchall()
 
+@timed
 def get_data_by_consultant(consultant):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT vehicle, consultant, mechanic, status FROM vehicles WHERE consultant=?', (consultant,))
-    data = c.fetchall()
-    conn.close()
-    return data
+    with connection() as conn:
+        return conn.execute('SELECT id, vehicle, consultant, mechanic, status FROM vehicles WHERE consultant=? ORDER BY id', (consultant,)).fetchall()
 
+@timed
 def get_data_by_mechanic(mechanic):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('SELECT vehicle, consultant, mechanic, status FROM vehicles WHERE mechanic=?', (mechanic,))
-    data = c.fetchall()
-    conn.close()
-    return data
-
-def delete_data(vehicle):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('DELETE FROM vehicles WHERE vehicle=?', (vehicle,))
-    conn.commit()
-    conn.close()
-
-def update_vehicle_consultant_mechanic_status(vehicle, new_consultant, new_mechanic, new_status):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('UPDATE vehicles SET consultant=?, mechanic=?, status=? WHERE vehicle=?', (new_consultant, new_mechanic, new_status, vehicle))
-    conn.commit()
-    conn.close()
+    with connection() as conn:
+        return conn.execute('SELECT id, vehicle, consultant, mechanic, status FROM vehicles WHERE mechanic=? ORDER BY id', (mechanic,)).fetchall()
+
+@timed
+def delete_data(vehicle_id):
+    with transaction() as conn:
+        conn.execute('DELETE FROM vehicles WHERE id=?', (vehicle_id,))
+
+@timed
+def update_vehicle_consultant_mechanic_status(vehicle_id, new_consultant, new_mechanic, new_status):
+    with transaction() as conn:
+        conn.execute(f'UPDATE vehicles SET consultant=?, mechanic=?, status=?, status_since=CASE WHEN status IS ? THEN status_since ELSE {NOW_SQL} END WHERE id=?', (new_consultant, new_mechanic, new_status, new_status, vehicle_id))
+
+# Histórico de status de um veículo: (de, para, instante, segundos no status anterior)
+@timed
+def get_vehicle_history(vehicle_id):
+    with connection() as conn:
+        return conn.execute('SELECT from_status, to_status, changed_at, seconds_in_status FROM status_history WHERE vehicle_id=? ORDER BY id', (vehicle_id,)).fetchall()
+
+# Quantidade de veículos no pátio por status
+@timed
+def get_status_counts():
+    with connection() as conn:
+        return conn.execute('SELECT status, total FROM status_counts WHERE total > 0').fetchall()
+
+# Carga de cada consultor: (consultor, status, quantidade)
+@timed
+def get_consultant_workload():
+    with connection() as conn:
+        return conn.execute('SELECT consultant, status, total FROM consultant_counts WHERE total > 0').fetchall()
+
+# Carga de cada mecânico: (mecânico, status, quantidade)
+@timed
+def get_mechanic_workload():
+    with connection() as conn:
+        return conn.execute('SELECT mechanic, status, total FROM mechanic_counts WHERE total > 0').fetchall()
+
+# Tempo em cada status das estadias encerradas: (status, estadias, média em segundos, máximo em segundos)
+@timed
+def get_status_time_stats():
+    with connection() as conn:
+        return conn.execute('SELECT status, transitions, total_seconds * 1.0 / transitions, max_seconds FROM status_time_stats').fetchall()
+
+# Há quanto tempo os veículos atuais estão no status: (status, veículos, média em segundos, máximo em segundos)
+@timed
+def get_current_status_ages():
+    with connection() as conn:
+        return conn.execute(f'SELECT status, COUNT(*), AVG({NOW_SQL} - status_since), MAX({NOW_SQL} - status_since) FROM vehicles GROUP BY status').fetchall()
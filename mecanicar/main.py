@@ -1,14 +1,43 @@
 import streamlit as st
-import pandas as pd
 import sqlite3 
 from db_funcs import *
+from render import render_table_html
+from backup import start_scheduler
+from bulk import FORMATS, detect_format, export_file, import_file
 from PIL import Image
 import time
+import io
 import os
-import shutil
-
-DB_PATH = "mecanicar/data.db"
-BACKUP_PATH = "mecanicar/database_backup.db"
+import logging
+from contextlib import contextmanager
+
+BACKUP_PATH = os.environ.get("MECANICAR_BACKUP_PATH", "mecanicar/database_backup.db")
+
+# Instrumentação: com MECANICAR_LOG_RERUNS=1 cada execução do script e dos fragmentos
+# registra no log o tempo total e o tempo gasto nas funções de db_funcs
+LOG_RERUNS = os.environ.get("MECANICAR_LOG_RERUNS") == "1"
+if LOG_RERUNS:
+    logging.basicConfig(level=logging.INFO)
+
+# Intervalo (segundos) entre as verificações de mudança nos dados
+POLL_INTERVAL = 1
+
+# Mede o bloco (ou a função decorada) e registra no log mesmo quando ele termina com
+# st.rerun() ou erro
+@contextmanager
+def log_run(label):
+    if not LOG_RERUNS:
+        yield
+        return
+    started = time.perf_counter()
+    with thread_timings() as db_calls:
+        try:
+            yield
+        finally:
+            logging.getLogger("mecanicar").info(
+                "Execução de %s: %.1f ms, %d chamadas ao banco (%.1f ms)",
+                label, (time.perf_counter() - started) * 1000, len(db_calls), sum(elapsed for _, elapsed in db_calls) * 1000,
+            )
 
 # Função para verificar se o banco de dados já existe
 def database_exists(db_path):
@@ -21,35 +50,116 @@ def create_database(db_path):
         create_table()
         conn.close()
 
-# Função para fazer backup do banco de dados
-def backup_database(db_path, backup_path):
-    shutil.copy(db_path, backup_path)
-
-# Função para restaurar o banco de dados a partir do backup
-def restore_database(db_path, backup_path):
-    shutil.copy(backup_path, db_path)
-
-# Fazer backup do banco de dados antes de qualquer alteração
-backup_database(DB_PATH, BACKUP_PATH)
-
-# Definindo as propriedades do DataFrame
-pd.set_option('display.max_rows', None)  # Exibir todas as linhas
-pd.set_option('display.max_columns', None)  # Exibir todas as colunas
-pd.set_option('display.width', 50)  # Largura da tela (para evitar que as colunas sejam truncadas)
-pd.set_option('display.expand_frame_repr', True)  # Evitar que as colunas sejam truncadas
-pd.set_option('max_colwidth', 20)  # Largura máxima da coluna (para evitar truncamento do conteúdo)
-
-# Função para aplicar cores ao DataFrame
-def color_df(val):
-    color_map = {
-        "Na fila": "purple",
-        "Orçamento": "orange",
-        "Aguardando Peças": "red",
-        "Em serviço": "blue",
-        "Pronto para retirada": "green"
+# Cria as tabelas uma única vez por processo
+@st.cache_resource
+def init_database():
+    create_table()
+
+# Quantidade de veículos exibidos por página nas tabelas
+PAGE_SIZE = 100
+
+# Snapshot único do pátio por versão do banco, compartilhado entre sessões: uma
+# só consulta traz todas as linhas e as fatias por status, consultor e mecânico
+# são montadas em memória
+@st.cache_resource(max_entries=2, show_spinner=False)
+def load_snapshot(version):
+    rows = view_all_data()
+    return rows, group_vehicles(rows)
+
+# Retorna as linhas do snapshot, opcionalmente filtradas por uma coluna
+def get_rows(version, column=None, value=None):
+    rows, slices = load_snapshot(version)
+    if column is None:
+        return rows
+    return slices[column].get(value, [])
+
+# HTML de uma página da tabela, em cache por versão, fatia e página
+@st.cache_data(max_entries=256, show_spinner=False)
+def render_page(version, column, value, page):
+    rows = get_rows(version, column, value)
+    return render_table_html(rows[page * PAGE_SIZE:(page + 1) * PAGE_SIZE])
+
+# Tabela que se atualiza sozinha: a cada intervalo só consulta a versão dos dados,
+# e volta ao banco apenas quando ela muda. Se page_version for informado, a página
+# inteira é recarregada quando os dados mudam (para atualizar os controles de edição).
+@st.fragment(run_every=POLL_INTERVAL)
+@log_run("live_table")
+def live_table(column=None, value=None, empty_message="Nenhum veículo encontrado.", page_version=None):
+    version = get_data_version()
+    if page_version is not None and version != page_version:
+        st.rerun()
+    rows = get_rows(version, column, value)
+    if not rows:
+        st.info(empty_message)
+        return
+
+    # Pagina a tabela quando o pátio tem mais veículos do que cabem em uma página
+    page = 0
+    pages = -(-len(rows) // PAGE_SIZE)
+    if pages > 1:
+        key = f"page-{column}-{value}"
+        if st.session_state.get(key, 1) > pages:
+            st.session_state[key] = pages
+        page = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, step=1, key=key) - 1
+    st.markdown(render_page(version, column, value, page), unsafe_allow_html=True)
+
+# Formata uma duração em segundos (horas ou dias)
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    hours = seconds / 3600
+    return f"{hours:.1f} h" if hours < 48 else f"{hours / 24:.1f} dias"
+
+# Monta a tabela de carga (uma linha por pessoa, uma coluna por status)
+def workload_table(rows, label):
+    table = {}
+    for name, status, total in rows:
+        table.setdefault(name, {label: name, **{option: 0 for option in status_options}})[status] = total
+    for row in table.values():
+        row["Total"] = sum(value for key, value in row.items() if key != label)
+    return sorted(table.values(), key=lambda row: -row["Total"])
+
+# Agregados do pátio, lidos das tabelas mantidas por triggers (custo independe do histórico)
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_metrics(version):
+    return {
+        "status_counts": get_status_counts(),
+        "consultants": get_consultant_workload(),
+        "mechanics": get_mechanic_workload(),
+        "time_stats": get_status_time_stats(),
+        "current_ages": get_current_status_ages(),
     }
-    color = color_map.get(val, "lightblue")
-    return f'background-color: {color}; color: white; font-size: 50px;'
+
+@st.fragment(run_every=POLL_INTERVAL)
+@log_run("live_metrics")
+def live_metrics():
+    metrics = load_metrics(get_data_version())
+
+    counts = dict(metrics["status_counts"])
+    for column, status in zip(st.columns(len(status_options)), status_options):
+        column.metric(status, counts.get(status, 0))
+
+    st.markdown("#### Carga por Mecânico")
+    st.dataframe(workload_table(metrics["mechanics"], "Mecânico"), use_container_width=True, hide_index=True)
+
+    st.markdown("#### Carga por Consultor")
+    st.dataframe(workload_table(metrics["consultants"], "Consultor"), use_container_width=True, hide_index=True)
+
+    st.markdown("#### Tempo em cada Status")
+    time_stats = {status: (transitions, average, maximum) for status, transitions, average, maximum in metrics["time_stats"]}
+    current_ages = {status: (vehicles, average, maximum) for status, vehicles, average, maximum in metrics["current_ages"]}
+    st.dataframe([
+        {
+            "Status": status,
+            "Estadias encerradas": time_stats.get(status, (0, None, None))[0],
+            "Tempo médio": format_duration(time_stats.get(status, (0, None, None))[1]),
+            "Tempo máximo": format_duration(time_stats.get(status, (0, None, None))[2]),
+            "Veículos agora": current_ages.get(status, (0, None, None))[0],
+            "Tempo médio atual": format_duration(current_ages.get(status, (0, None, None))[1]),
+            "Mais antigo atual": format_duration(current_ages.get(status, (0, None, None))[2]),
+        }
+        for status in status_options
+    ], use_container_width=True, hide_index=True)
 
 st.set_page_config(
     page_title="Gestão de Pátio de Oficina",
@@ -58,138 +168,139 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+init_database()
+# Inicia o backup em segundo plano (uma única thread por processo)
+start_scheduler(DB_PATH, BACKUP_PATH)
+
 st.title("🛠️ Gestão de Pátio de Oficina 🚗")
 
 st.sidebar.image("mecanicar/marca-nova.jpg")
 st.sidebar.title("Menu")
 
-choice = st.sidebar.radio("", ["Visualizar Todos os Veículos 📝","Adicionar Veículo 🚙","Visualizar Veículos por Status 📊","Visualizar por Consultor 👨‍🔧", "Visualizar por Mecânico 🔧"])
-
-status_options = ["Na fila", "Orçamento", "Aguardando Peças", "Em serviço", "Pronto para retirada"]
-
-if choice == "Adicionar Veículo 🚙":
-    st.subheader("Adicionar Veículo")
-    col1, col2, col3 = st.columns(3)
-
-    with col1:
-        vehicle = st.text_input("Veículo")
-
-    with col2:
-        consultant = st.selectbox("Consultor Responsável", ["Rafael", "Rudimar", "Samuel", "Jéssica", "Paulo"])
-
-    with col3:
-        mechanic = st.selectbox("Mecânico Responsável", ["Vini", "Valdo", "Danilo", "Fosco", "Szczhoca", "Weslei"])
-
-    status = st.selectbox("Status", status_options)
+choice = st.sidebar.radio("", ["Visualizar Todos os Veículos 📝","Adicionar Veículo 🚙","Visualizar Veículos por Status 📊","Visualizar por Consultor 👨‍🔧", "Visualizar por Mecânico 🔧", "Métricas do Pátio 📈", "Importar / Exportar 📦"])
 
-    if st.button("Adicionar Veículo"):
-        add_vehicle(vehicle, consultant, mechanic, status)
-        st.success(f"Veículo \"{vehicle}\" adicionado com sucesso! 🚀")
-        st.session_state['update'] = True
-
-elif choice == "Visualizar Veículos por Status 📊":
-    st.subheader("Visualizar Veículos por Status")
-
-    status_filter = st.selectbox("Selecione um Status", status_options)
-    filtered_data = get_data_by_status(status_filter)
-
-    if filtered_data:
-        df_filtered = pd.DataFrame(filtered_data, columns=["Veículo", "Consultor", "Mecânico", "Status"]).reset_index(drop=True)
-        df_styled = df_filtered.style.applymap(color_df, subset=["Status"]).set_table_styles(
-            [{'selector': 'td', 'props': [('font-size', '25px')]}]
-        )
-        st.markdown(df_styled.to_html(), unsafe_allow_html=True)
-       
-    else:
-        st.info("Nenhum veículo encontrado com o status selecionado.")        
-
-elif choice == "Visualizar Todos os Veículos 📝":
-    st.subheader("Visualizar Todos os Veículos")
-
-    all_data = view_all_data()
-
-    if all_data:
-        df_all = pd.DataFrame(all_data, columns=["Veículo", "Consultor", "Mecânico", "Status"]).reset_index(drop=True)
-        
-        # Adicionando opções para modificar o consultor e o mecânico
-        selected_vehicle = st.selectbox("Selecione um Veículo", df_all["Veículo"].unique())
-        current_row = df_all[df_all["Veículo"] == selected_vehicle].iloc[0]  # Obtém a linha correspondente ao veículo selecionado
-        current_status = current_row["Status"]
-        current_consultant = current_row["Consultor"]
-        current_mechanic = current_row["Mecânico"]
-
-        # Define o valor padrão dos selectbox para ser o consultor e o mecânico atuais
-        new_consultant = st.selectbox("Selecione um Novo Consultor", ["Paulo", "Jéssica", "Samuel", "Rafael", "Rudimar"], index=["Paulo", "Jéssica", "Samuel", "Rafael", "Rudimar"].index(current_consultant))
-        new_mechanic = st.selectbox("Selecione um Novo Mecânico", ["Vini", "Valdo", "Danilo", "Fosco", "Szczhoca", "Weslei"], index=["Vini", "Valdo", "Danilo", "Fosco", "Szczhoca", "Weslei"].index(current_mechanic))
-        new_status = st.selectbox("Selecione um Novo Status", status_options, index=status_options.index(current_status))
+status_options = STATUS_OPTIONS
 
+# Mede a execução da tela escolhida (ver log_run)
+with log_run(choice):
+    if choice == "Adicionar Veículo 🚙":
+        st.subheader("Adicionar Veículo")
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            if st.button("Atualizar Consultor, Mecânico e Status"):
-                update_vehicle_consultant_mechanic_status(selected_vehicle, new_consultant, new_mechanic, new_status)
-                time.sleep(0.5)
-                st.rerun()
-                st.success(f"Consultor, Mecânico e Status do veículo \"{selected_vehicle}\" atualizados com sucesso! 🚀")
-                st.session_state['update'] = True
-                
+            vehicle = st.text_input("Veículo")
+
+        with col2:
+            consultant = st.selectbox("Consultor Responsável", CONSULTANTS)
 
         with col3:
-            delete_button = st.button(f"Excluir {selected_vehicle}")
-            if delete_button:
-                delete_data(selected_vehicle)
-                time.sleep(0.5)
-                st.rerun()
-                st.success(f"Veículo \"{selected_vehicle}\" deletado com sucesso! 🚗")
-                st.session_state['update'] = True
-                
-
-        # Renderiza o DataFrame com a coluna de botões
-        df_styled = df_all.style.applymap(color_df, subset=["Status"]).set_table_styles(
-            [{'selector': 'td', 'props': [('font-size', '25px')]}]
-        )
-        st.markdown(df_styled.to_html(), unsafe_allow_html=True)
-
-        while True:
-            time.sleep(1)
-            st.rerun()
-
-    else:
-        st.info("Nenhum veículo encontrado.")
-        
-        while True:
-            time.sleep(10)
-            st.rerun()
-elif choice == "Visualizar por Consultor 👨‍🔧":
-    st.subheader("Visualizar Veículos por Consultor")
-    consultant = st.selectbox("Selecione um Consultor", ["Paulo", "Jéssica", "Samuel", "Rafael", "Rudimar"])
-    data = get_data_by_consultant(consultant)
-    if data:
-        df = pd.DataFrame(data, columns=["Veículo", "Consultor", "Mecânico", "Status"])
-        df_styled = df.style.applymap(color_df, subset=["Status"]).set_table_styles(
-            [{'selector': 'td', 'props': [('font-size', '25px')]}]
-        )
-        st.markdown(df_styled.to_html(), unsafe_allow_html=True)
-    else:
-        st.info("Nenhum veículo encontrado para este consultor.")
-
-elif choice == "Visualizar por Mecânico 🔧":
-    st.subheader("Visualizar Veículos por Mecânico")
-    mechanic = st.selectbox("Selecione um Mecânico", ["Vini", "Valdo", "Danilo", "Fosco", "Szczhoca", "Weslei"])
-    data = get_data_by_mechanic(mechanic)
-    if data:
-        df = pd.DataFrame(data, columns=["Veículo", "Consultor", "Mecânico", "Status"])
-        df_styled = df.style.applymap(color_df, subset=["Status"]).set_table_styles(
-            [{'selector': 'td', 'props': [('font-size', '25px')]}]
-        )
-        st.markdown(df_styled.to_html(), unsafe_allow_html=True)
-    else:
-        st.info("Nenhum veículo encontrado para este mecânico.")
+            mechanic = st.selectbox("Mecânico Responsável", MECHANICS)
+
+        status = st.selectbox("Status", status_options)
+
+        if st.button("Adicionar Veículo"):
+            add_vehicle(vehicle, consultant, mechanic, status)
+            st.success(f"Veículo \"{vehicle}\" adicionado com sucesso! 🚀")
+
+    elif choice == "Visualizar Veículos por Status 📊":
+        st.subheader("Visualizar Veículos por Status")
+
+        status_filter = st.selectbox("Selecione um Status", status_options)
+        live_table("status", status_filter, "Nenhum veículo encontrado com o status selecionado.")
+
+    elif choice == "Visualizar Todos os Veículos 📝":
+        st.subheader("Visualizar Todos os Veículos")
+
+        page_version = get_data_version()
+        all_data = get_rows(page_version)
+
+        # Busca no índice de texto; sem busca, lista os veículos mais recentes
+        search = st.text_input("Buscar Veículo", placeholder="Placa, modelo, consultor ou mecânico")
+        if search:
+            results = search_vehicles(search, limit=SEARCH_LIMIT + 1)
+            vehicles = {row[0]: row[:5] for row in results[:SEARCH_LIMIT] if not row[5]}
+            closed = [row for row in results[:SEARCH_LIMIT] if row[5]]
+            if not results:
+                st.info("Nenhum veículo encontrado para a busca.")
+            elif len(results) > SEARCH_LIMIT:
+                st.caption(f"Mostrando os {SEARCH_LIMIT} resultados mais recentes; refine a busca para ver outros.")
+            if closed:
+                with st.expander(f"Serviços encerrados ({len(closed)})"):
+                    st.dataframe([
+                        {"ID": vehicle_id, "Veículo": vehicle, "Consultor": consultant, "Mecânico": mechanic, "Último status": status}
+                        for vehicle_id, vehicle, consultant, mechanic, status, _ in closed
+                    ], use_container_width=True, hide_index=True)
+        else:
+            vehicles = {row[0]: row for row in reversed(all_data[-SEARCH_LIMIT:])}
+
+        if vehicles:
+            # Adicionando opções para modificar o consultor e o mecânico; o veículo é identificado pelo ID
+            selected_id = st.selectbox("Selecione um Veículo", list(vehicles), format_func=lambda vehicle_id: f"#{vehicle_id} - {vehicles[vehicle_id][1]}")
+            _, selected_vehicle, current_consultant, current_mechanic, current_status = vehicles[selected_id]  # Obtém a linha correspondente ao veículo selecionado
+
+            # Define o valor padrão dos selectbox para ser o consultor e o mecânico atuais
+            new_consultant = st.selectbox("Selecione um Novo Consultor", CONSULTANTS, index=CONSULTANTS.index(current_consultant))
+            new_mechanic = st.selectbox("Selecione um Novo Mecânico", MECHANICS, index=MECHANICS.index(current_mechanic))
+            new_status = st.selectbox("Selecione um Novo Status", status_options, index=status_options.index(current_status))
+
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                if st.button("Atualizar Consultor, Mecânico e Status"):
+                    update_vehicle_consultant_mechanic_status(selected_id, new_consultant, new_mechanic, new_status)
+                    st.rerun()
+
+            with col3:
+                delete_button = st.button(f"Excluir {selected_vehicle}")
+                if delete_button:
+                    delete_data(selected_id)
+                    st.rerun()
+
+            # Histórico de status do veículo selecionado
+            with st.expander("Histórico de Status"):
+                st.dataframe([
+                    {
+                        "De": from_status or "-",
+                        "Para": to_status or "Saiu do pátio",
+                        "Quando": time.strftime("%d/%m/%Y %H:%M", time.localtime(changed_at)),
+                        "Tempo no status anterior": format_duration(seconds_in_status),
+                    }
+                    for from_status, to_status, changed_at, seconds_in_status in get_vehicle_history(selected_id)
+                ], use_container_width=True, hide_index=True)
+
+        # Renderiza a tabela; a página é recarregada apenas quando os dados mudam
+        live_table(page_version=page_version)
+
+    elif choice == "Visualizar por Consultor 👨‍🔧":
+        st.subheader("Visualizar Veículos por Consultor")
+        consultant = st.selectbox("Selecione um Consultor", CONSULTANTS)
+        live_table("consultant", consultant, "Nenhum veículo encontrado para este consultor.")
+
+    elif choice == "Visualizar por Mecânico 🔧":
+        st.subheader("Visualizar Veículos por Mecânico")
+        mechanic = st.selectbox("Selecione um Mecânico", MECHANICS)
+        live_table("mechanic", mechanic, "Nenhum veículo encontrado para este mecânico.")
+
+    elif choice == "Métricas do Pátio 📈":
+        st.subheader("Métricas do Pátio")
+        live_metrics()
+
+    elif choice == "Importar / Exportar 📦":
+        st.subheader("Importar Veículos")
+        uploaded = st.file_uploader("Arquivo CSV ou Parquet (colunas: Veículo, Consultor, Mecânico, Status)", type=FORMATS)
+        if uploaded is not None and st.button("Importar"):
+            inserted, errors = import_file(uploaded, detect_format(uploaded.name))
+            st.success(f"{inserted} veículos importados! 🚀")
+            if errors:
+                st.warning(f"{len(errors)} linhas rejeitadas.")
+                st.dataframe([{"Linha": line, "Erro": error} for line, error in errors[:100]], use_container_width=True, hide_index=True)
+
+        st.subheader("Exportar Veículos")
+        export_format = st.radio("Formato", FORMATS, horizontal=True)
+        if st.button("Gerar arquivo"):
+            buffer = io.BytesIO()
+            total = export_file(buffer, export_format)
+            st.download_button(f"Baixar {total} veículos", buffer.getvalue(), file_name=f"veiculos.{export_format}")
 
 st.markdown("<br><hr><center>Desenvolvido por Vinight </center><hr>", unsafe_allow_html=True)
 
-# Forçar a atualização da página se houver uma mudança de estado
-if 'update' in st.session_state:
-    time.sleep(0.5)
-    del st.session_state['update']
-    st.rerun()
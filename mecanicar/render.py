@@ -0,0 +1,34 @@
+from html import escape
+
+# Cores de fundo de cada status
+STATUS_COLORS = {
+    "Na fila": "purple",
+    "Orçamento": "orange",
+    "Aguardando Peças": "red",
+    "Em serviço": "blue",
+    "Pronto para retirada": "green"
+}
+DEFAULT_COLOR = "lightblue"
+
+HEADERS = ["Veículo", "Consultor", "Mecânico", "Status"]
+
+TABLE_CSS = """<style>
+table.yard td { font-size: 25px; }
+table.yard td.status { color: white; font-size: 50px; }
+</style>"""
+
+# Estilo da célula de status (mesmo visual do antigo color_df)
+def status_style(status):
+    return f'background-color: {STATUS_COLORS.get(status, DEFAULT_COLOR)};'
+
+# Gera o HTML da tabela a partir das linhas (id, veículo, consultor, mecânico, status)
+# em uma única passada, sem montar DataFrame nem Styler
+def render_table_html(rows):
+    styles = {status: status_style(status) for status in {row[4] for row in rows}}
+    body = "".join(
+        f'<tr><th>{vehicle_id}</th><td>{escape(vehicle)}</td><td>{escape(consultant)}</td>'
+        f'<td>{escape(mechanic)}</td><td class="status" style="{styles[status]}">{escape(status)}</td></tr>'
+        for vehicle_id, vehicle, consultant, mechanic, status in rows
+    )
+    header = "".join(f"<th>{name}</th>" for name in HEADERS)
+    return f'{TABLE_CSS}<table class="yard"><thead><tr><th>ID</th>{header}</tr></thead><tbody>{body}</tbody></table>'
@@ -0,0 +1,203 @@
+import argparse
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import db_funcs
+from db_funcs import CONSULTANTS, MECHANICS, STATUS_OPTIONS, VEHICLE_FIELDS, get_data_version, group_vehicles, view_all_data
+from render import render_table_html
+
+# Serviço HTTP somente leitura para as TVs do pátio, sem Streamlit nem pandas:
+#   /api/version                          versão atual dos dados
+#   /api/vehicles                         todos os veículos (JSON)
+#   /api/vehicles/<status|mechanic|consultant>/<valor>
+#   /board, /board/<coluna>/<valor>       quadro em HTML já renderizado
+# Toda resposta traz um ETag com a versão dos dados. Com If-None-Match e ?wait=N
+# a requisição espera até N segundos por uma mudança antes de responder 304.
+
+# Intervalo (segundos) entre as leituras da versão dos dados
+POLL_INTERVAL = 0.5
+# Tempo máximo (segundos) de espera de uma requisição de long-polling
+MAX_WAIT = 60
+
+logger = logging.getLogger(__name__)
+
+# Valores aceitos em cada filtro; qualquer outro responde 404 (e não ocupa o cache)
+SLICE_VALUES = {"consultant": CONSULTANTS, "mechanic": MECHANICS, "status": STATUS_OPTIONS}
+
+BOARD_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Gestão de Pátio de Oficina</title></head>
+<body>
+<h1>🛠️ Gestão de Pátio de Oficina 🚗</h1>
+{table}
+<script>
+// Recarrega a página assim que a versão dos dados mudar; em caso de erro (falha de rede
+// ou resposta diferente de 200/304) espera alguns segundos antes de tentar de novo
+(async function () {{
+  while (true) {{
+    try {{
+      const response = await fetch("/api/version?wait=30", {{headers: {{"If-None-Match": {etag}}}}});
+      if (response.status === 200) {{ location.reload(); return; }}
+      if (response.status === 304) {{ continue; }}
+    }} catch (error) {{}}
+    await new Promise(resolve => setTimeout(resolve, 5000));
+  }}
+}})();
+</script>
+</body></html>"""
+
+# Acompanha a versão dos dados em uma única thread e acorda as requisições em espera
+class VersionWatcher(threading.Thread):
+    def __init__(self, interval=POLL_INTERVAL):
+        super().__init__(name='mecanicar-version-watcher', daemon=True)
+        self.interval = interval
+        self.version = get_data_version()
+        self.changed = threading.Condition()
+
+    def run(self):
+        while True:
+            try:
+                version = get_data_version()
+            except sqlite3.Error:
+                version = self.version
+            if version != self.version:
+                with self.changed:
+                    self.version = version
+                    self.changed.notify_all()
+            time.sleep(self.interval)
+
+    # Espera até a versão ser diferente de known_version ou o tempo acabar
+    def wait_for_change(self, known_version, timeout):
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != known_version, timeout)
+            return self.version
+
+# Snapshot dos veículos e respostas já serializadas, refeitos apenas quando a versão muda
+class BoardCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.rows = []
+        self.slices = {}
+        self.bodies = {}
+
+    def get(self, version, kind, column, value):
+        with self.lock:
+            if version != self.version:
+                self.rows = view_all_data()
+                self.slices = group_vehicles(self.rows)
+                self.bodies = {}
+                self.version = version
+            key = (kind, column, value)
+            if key not in self.bodies:
+                rows = self.rows if column is None else self.slices[column].get(value, [])
+                self.bodies[key] = self._render(version, kind, rows)
+            return self.bodies[key]
+
+    @staticmethod
+    def _render(version, kind, rows):
+        if kind == 'board':
+            return BOARD_PAGE.format(table=render_table_html(rows), etag=json.dumps(etag_for(version))).encode('utf-8')
+        return json.dumps({'version': version, 'columns': VEHICLE_FIELDS, 'rows': rows}, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def etag_for(version):
+    return f'"v{version}"'
+
+# Verifica se o cabeçalho If-None-Match contém o ETag informado
+def etag_matches(if_none_match, etag):
+    return bool(if_none_match) and (if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')])
+
+class BoardHandler(BaseHTTPRequestHandler):
+    watcher = None
+    cache = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        query = parse_qs(url.query)
+
+        # Identifica o recurso: (tipo, coluna, valor)
+        if parts == ['api', 'version']:
+            kind, column, value = 'version', None, None
+        elif parts[0] in ('api', 'board') and (parts[0] == 'board' or parts[1:2] == ['vehicles']):
+            kind = 'board' if parts[0] == 'board' else 'json'
+            filters = parts[1:] if kind == 'board' else parts[2:]
+            if not filters:
+                column, value = None, None
+            elif len(filters) == 2 and filters[1] in SLICE_VALUES.get(filters[0], ()):
+                column, value = filters
+            else:
+                return self.send_error(HTTPStatus.NOT_FOUND)
+        else:
+            return self.send_error(HTTPStatus.NOT_FOUND)
+
+        version = self.watcher.version
+        if_none_match = self.headers.get('If-None-Match')
+        if etag_matches(if_none_match, etag_for(version)) and 'wait' in query:
+            try:
+                wait = float(query['wait'][0])
+            except ValueError:
+                return self.send_error(HTTPStatus.BAD_REQUEST)
+            # nan ou inf fariam a espera nunca expirar
+            if not math.isfinite(wait):
+                return self.send_error(HTTPStatus.BAD_REQUEST)
+            wait = max(0.0, min(wait, MAX_WAIT))
+            version = self.watcher.wait_for_change(version, wait)
+
+        etag = etag_for(version)
+        if etag_matches(if_none_match, etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        if kind == 'version':
+            body = json.dumps({'version': version}).encode('utf-8')
+        else:
+            body = self.cache.get(version, kind, column, value)
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/html; charset=utf-8' if kind == 'board' else 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    # O log de acesso fica desligado (as TVs fazem uma requisição a cada poucos segundos)
+    def log_message(self, format, *args):
+        pass
+
+    # Respostas de erro (send_error) continuam indo para o log
+    def log_error(self, format, *args):
+        logger.warning('%s - %s', self.address_string(), format % args)
+
+def make_server(host, port):
+    db_funcs.create_table()
+    watcher = VersionWatcher()
+    watcher.start()
+    handler = type('Handler', (BoardHandler,), {'watcher': watcher, 'cache': BoardCache()})
+    return ThreadingHTTPServer((host, port), handler)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quadro do pátio em JSON/HTML para as TVs da oficina")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--db", default=db_funcs.DB_PATH, help="caminho do banco de dados")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    db_funcs.DB_PATH = args.db
+    server = make_server(args.host, args.port)
+    print(f"Servindo o quadro do pátio em http://{args.host}:{args.port}/board")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()